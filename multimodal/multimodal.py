@@ -92,7 +92,10 @@ class VisionEncoder(nn.Module):
             features = self.model.head(x)
             feature_map = None
         else:
-            # forward pass for cnn models
+            # forward pass for cnn models; match the NHWC weight layout set
+            # in _load_pretrained_cnn so cuDNN picks Tensor Core kernels
+            # without internal NCHW<->NHWC reshuffles
+            x = x.to(memory_format=torch.channels_last)
             if self.embedding_type == "spatial":
                 layer = self.model[-2]
             else:
@@ -191,6 +194,11 @@ class VisionEncoder(nn.Module):
             else:
                 model.fc = nn.Linear(self.last_cnn_out_dim, self.embedding_dim)
 
+        if not self.vit_dino:
+            # store conv weights in channels_last (NHWC) memory format; with
+            # autocast this lets the convolutions run on Tensor Cores
+            model = model.to(memory_format=torch.channels_last)
+
         return model
 
 
@@ -732,8 +740,11 @@ class MultiModalModel(nn.Module):
     def encode_image(self, image):
         image_features, image_feature_map = self.image_embed(image)
         if self.normalize_features:
-            # normalize image features
-            image_features = F.normalize(image_features, p=2, dim=1)
+            # normalize image features; the explicit rsqrt-multiply form
+            # avoids the extra norm tensor and divide of F.normalize
+            inv_norm = image_features.pow(2).sum(1, keepdim=True) \
+                .clamp_min(1e-12).rsqrt()
+            image_features = image_features * inv_norm
         return image_features, image_feature_map
 
     def encode_text(self, text, text_length):
@@ -743,19 +754,18 @@ class MultiModalModel(nn.Module):
             text_features = F.normalize(text_features, p=2, dim=-1)
         return text_features, text_outputs
 
-    def forward(self, image, text, text_length, return_image_features=False, return_text_outputs=False):
-        # encode image and text
-        image_features, image_feature_map = self.encode_image(image)
-        text_features, text_outputs = self.encode_text(text, text_length)
-
+    def compute_match(self, image_features, text_features, text_length):
+        """Compute the match (similarity) matrix with image_features as rows
+        and text_features as columns.
+        """
         if self.embedding_type == "flat":
-            # image_features: (B, E), text_features: (B, E)
+            # image_features: (I, E), text_features: (T, E)
 
             # calculate match similarity
             match = image_features @ text_features.T
 
         elif self.embedding_type == "spatial":
-            # image_features: (B, E, H, W), text_features: (B, L, E)
+            # image_features: (I, E, H, W), text_features: (T, L, E)
 
             # calculate batched similarity
             if self.sim == "mean":
@@ -779,6 +789,16 @@ class MultiModalModel(nn.Module):
                 # divide by h, w, l
                 match = torch.sum(match_max, dim=2) / text_length
 
+        return match
+
+    def forward(self, image, text, text_length, return_image_features=False, return_text_outputs=False):
+        # encode image and text
+        image_features, image_feature_map = self.encode_image(image)
+        text_features, text_outputs = self.encode_text(text, text_length)
+
+        # calculate match similarity
+        match = self.compute_match(image_features, text_features, text_length)
+
         # transform to logits and scale with temperature param
         logit_log_scale = self.logit_neg_log_temperature
         logit_scale = logit_log_scale.exp()
@@ -793,16 +813,45 @@ class MultiModalModel(nn.Module):
             ret = ret + (text_outputs,)
         return ret
 
-    def calculate_contrastive_loss(self, x, y, y_len):
-        logits_per_image, logits_per_text, image_features, image_feature_map,\
-        text_outputs = self(
-            x, y, y_len, return_image_features=True, return_text_outputs=True)
+    def calculate_contrastive_loss(self, x, y, y_len, all_gather=None, rank=0):
+        # encode image and text
+        image_features, image_feature_map = self.encode_image(x)
+        text_features, text_outputs = self.encode_text(y, y_len)
 
         # create ground truth labels
         batch_size = x.size(0)
-        ground_truth = torch.tensor(
-            np.arange(batch_size), dtype=torch.long,
-            device=logits_per_image.device)
+        ground_truth = torch.arange(
+            batch_size, dtype=torch.long,
+            device=image_features.device)
+
+        # transform to logits and scale with temperature param; the scale is
+        # folded into the image features once (valid for both mean and max
+        # similarity since it is positive), so compute_match directly yields
+        # scaled logits without extra elementwise passes over the match
+        # matrices
+        logit_scale = self.logit_neg_log_temperature.exp()
+        scaled_image_features = image_features * logit_scale
+
+        if all_gather is not None and self.embedding_type == "flat":
+            # gather features from all DDP ranks so each InfoNCE sees the
+            # whole effective batch of negatives; only the local rows of the
+            # logits are kept (targets offset by rank * batch_size) to avoid
+            # materializing the full (world_size * B)^2 logits
+            # (spatial text features are padded to the per-rank batch max, so
+            # cross-rank gathering is only supported for flat embeddings)
+            all_image_features = all_gather(scaled_image_features)\
+                .flatten(0, 1)
+            all_text_features = all_gather(text_features).flatten(0, 1)
+            logits_per_image = self.compute_match(
+                scaled_image_features, all_text_features, y_len)
+            logits_per_text = self.compute_match(
+                all_image_features, text_features, y_len).t()
+            ground_truth = ground_truth + rank * batch_size
+        else:
+            match = self.compute_match(
+                scaled_image_features, text_features, y_len)
+            logits_per_image = match
+            logits_per_text = match.t()
 
         # calculate infonce loss
         infonce_loss = (
@@ -867,6 +916,7 @@ class LanguageModel(nn.Module):
         image_features=None,
         image_feature_map=None,
         tokenwise=False,
+        reduction="mean",
         weight=None,
     ):
         outputs, logits, attns = self(
@@ -886,7 +936,7 @@ class LanguageModel(nn.Module):
             labels,
             weight=weight,
             ignore_index=PAD_TOKEN_ID,
-            reduction="none" if tokenwise else "mean")
+            reduction="none" if tokenwise else reduction)
 
         return loss, outputs, logits, attns, labels
 
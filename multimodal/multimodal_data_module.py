@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Any, Tuple
 import json
 import argparse
+import os
 
 from PIL import Image
 from torchvision import transforms
@@ -25,7 +26,8 @@ EVAL_METADATA_FILENAME = "eval_dev.json"
 # dataloader arguments
 BATCH_SIZE = 4
 VAL_BATCH_SIZE = 16
-NUM_WORKERS = 4
+EVAL_BATCH_SIZE = 1
+NUM_WORKERS = max(4, (os.cpu_count() or 8) // 2)
 EVAL_INCLUDE_SOS_EOS = False
 
 # evaluation arguments
@@ -226,6 +228,8 @@ class MultiModalDataModule(pl.LightningDataModule):
         self.batch_size = self.args.get("batch_size", BATCH_SIZE)
         self.drop_last = self.args.get("drop_last", False)
         self.val_batch_size = self.args.get("val_batch_size", VAL_BATCH_SIZE)
+        self.eval_batch_size = self.args.get(
+            "eval_batch_size", EVAL_BATCH_SIZE)
         self.num_workers = self.args.get("num_workers", NUM_WORKERS)
         self.on_gpu = isinstance(self.args.get("gpus", None), (str, int))
         self.augment_frames = self.args.get("augment_frames", AUGMENT_FRAMES)
@@ -290,6 +294,9 @@ class MultiModalDataModule(pl.LightningDataModule):
         parser.add_argument(
             "--val_batch_size", type=int, default=VAL_BATCH_SIZE, help="Number of examples to operate on per forward step during validation."
         )
+        parser.add_argument(
+            "--eval_batch_size", type=int, default=EVAL_BATCH_SIZE, help="Number of evaluation trials to operate on per forward step."
+        )
         parser.add_argument(
             "--num_workers", type=int, default=NUM_WORKERS, help="Number of additional processes to load data."
         )
@@ -359,6 +366,20 @@ class MultiModalDataModule(pl.LightningDataModule):
 
         return eval_datasets
 
+    def _dataloader_kwargs(self):
+        """Shared worker/memory DataLoader settings: pin host memory when
+        training on GPU so host-to-device copies are async, and keep workers
+        (and their prefetched batches) alive across epochs. The latter two
+        options are only valid with multiprocess loading."""
+        kwargs = {
+            "num_workers": self.num_workers,
+            "pin_memory": self.on_gpu,
+        }
+        if self.num_workers > 0:
+            kwargs["persistent_workers"] = True
+            kwargs["prefetch_factor"] = 4
+        return kwargs
+
     def train_dataloader(self, batch_size=None, shuffle=True, drop_last=None):
         if batch_size is None:
             batch_size = self.batch_size
@@ -371,8 +392,7 @@ class MultiModalDataModule(pl.LightningDataModule):
             shuffle=shuffle,
             batch_size=batch_size,
             drop_last=drop_last,
-            num_workers=self.num_workers,
-            pin_memory=False,
+            **self._dataloader_kwargs(),
         )
 
     def val_test_dataloader(self, dataset, eval_dataset, batch_size=None,
@@ -386,18 +406,17 @@ class MultiModalDataModule(pl.LightningDataModule):
             shuffle=shuffle,
             batch_size=batch_size,
             drop_last=drop_last,
-            num_workers=self.num_workers,
-            pin_memory=False,
+            **self._dataloader_kwargs(),
         )
 
         eval_dataloader = DataLoader(
             eval_dataset,
             collate_fn=multiModalDataset_collate_fn,
             shuffle=shuffle,
-            # batch_size=self.batch_size // 4,  # divide by 4 here since eval trials have 4 images
-            batch_size=1,
-            num_workers=self.num_workers,
-            pin_memory=False,
+            # note that every trial in the batch contributes all of its
+            # images to the forward pass
+            batch_size=self.eval_batch_size,
+            **self._dataloader_kwargs(),
         )
 
         return [dataloader, eval_dataloader]
@@ -1,8 +1,7 @@
 import argparse
 import functools
-import copy
+from dataclasses import dataclass, fields
 import json
-import numpy as np
 import os
 import spacy
 import torch
@@ -32,6 +31,39 @@ LENGTH_PENALTY_ALPHA = 0.0
 # print arguments
 PRINT_EVAL_TEXTGEN_EXAMPLE_IDS = range(10)
 
+
+@dataclass(frozen=True)
+class LitHparams:
+    """Typed hyperparameters for MultiModalLitModel, frozen so attribute
+    access is a plain slot lookup and values can't drift after init.
+    """
+    optimizer: type = OPTIMIZER
+    lr: float = LR
+    lr_scheduler: bool = False
+    factor: float = FACTOR
+    patience: int = PATIENCE
+    weight_decay: float = WEIGHT_DECAY
+    lambda_mm: float = 1.
+    lambda_lm: float = 0.
+    lambda_ar: float = 0.
+    optimize_unused: bool = False
+    eval_textgen: bool = False
+    beam_width: int = BEAM_WIDTH
+    decode_length: int = DECODE_LENGTH
+    length_penalty_alpha: float = LENGTH_PENALTY_ALPHA
+    log_detailed_lm: bool = False
+    compile: bool = False
+
+    @classmethod
+    def from_args(cls, args):
+        """Build from an argparse.Namespace, falling back to the defaults
+        for any missing field (e.g. when loading older checkpoints).
+        """
+        args = vars(args) if args is not None else {}
+        return cls(**{field.name: args[field.name]
+                      for field in fields(cls) if field.name in args})
+
+
 class MultiModalLitModel(pl.LightningModule):
     """
     PyTorch Lightning class for MultiModal SAYCam model
@@ -41,29 +73,37 @@ class MultiModalLitModel(pl.LightningModule):
         super().__init__()
         self.args = vars(args) if args is not None else {}
 
-        self.optimizer_class = self.args.get("optimizer", OPTIMIZER)
-        self.lr = self.args.get("lr", LR)
-        self.lr_scheduler = self.args.get("lr_scheduler", False)
-        self.factor = self.args.get("factor", FACTOR)
-        self.patience = self.args.get("patience", PATIENCE)
-        self.weight_decay = self.args.get("weight_decay", WEIGHT_DECAY)
-        # self.alpha = self.args.get("alpha", ALPHA)
-        self.lambda_mm = self.args.get("lambda_mm", 1.)
-        self.lambda_lm = self.args.get("lambda_lm", 0.)
-        self.lambda_ar = self.args.get("lambda_ar", 0.)
-        self.optimize_unused = self.args.get("optimize_unused", False)
-        self.eval_textgen = self.args.get("eval_textgen", False)
-        self.beam_width = self.args.get("beam_width", BEAM_WIDTH)
-        self.decode_length = self.args.get("decode_length", DECODE_LENGTH)
-        self.length_penalty_alpha = self.args.get(
-            "length_penalty_alpha", LENGTH_PENALTY_ALPHA)
+        self.hp = LitHparams.from_args(args)
+        # the Trainer --precision flag (from pl.Trainer.add_argparse_args)
+        # only autocasts the training loop; mirror it for manually invoked
+        # encoder forwards
+        self.autocast_bf16 = str(self.args.get("precision", 32)) \
+            in ("bf16", "bf16-mixed")
 
         self.vision_encoder = vision_encoder
         self.text_encoder = text_encoder
+        if self.hp.compile and hasattr(torch, "compile"):
+            # compile the encoders rather than the wrapper modules: the
+            # wrappers are mostly invoked through methods other than
+            # forward(), which torch.compile does not intercept, while the
+            # encoders are called through __call__ on every path
+            self.vision_encoder = torch.compile(
+                self.vision_encoder, mode="max-autotune", dynamic=False)
+            self.text_encoder = torch.compile(
+                self.text_encoder, mode="max-autotune", dynamic=False)
         self.model = MultiModalModel(
             self.vision_encoder, self.text_encoder, args)
         self.language_model = LanguageModel(self.text_encoder, args)
 
+        # pre-placed special-token ids, so hot-path comparisons don't
+        # re-broadcast Python ints to device scalars every step
+        self.register_buffer(
+            '_pad_id', torch.tensor(PAD_TOKEN_ID), persistent=False)
+        self.register_buffer(
+            '_sos_id', torch.tensor(SOS_TOKEN_ID), persistent=False)
+        self.register_buffer(
+            '_eos_id', torch.tensor(EOS_TOKEN_ID), persistent=False)
+
         # get vocab
         self.vocab_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocab.json")
         with open(self.vocab_path) as f:
@@ -108,16 +148,26 @@ class MultiModalLitModel(pl.LightningModule):
                             default=LENGTH_PENALTY_ALPHA,
                             help="beam search length penalty (alpha); "
                                  "0 for no length penalty.")
+        parser.add_argument("--log_detailed_lm", action="store_true",
+                            help="also log the wo_sos/wo_sos_eos ce losses "
+                                 "during training (always logged in val/test)")
+        parser.add_argument("--compile", action="store_true",
+                            help="compile the encoders with torch.compile")
 
     def configure_optimizers(self):
-        optimizer = self.optimizer_class(
-            self.parameters(), lr=self.lr, weight_decay=self.weight_decay)
-        if not self.lr_scheduler:
+        # skip frozen parameters (e.g. the CNN without --finetune_cnn) so
+        # the optimizer doesn't keep AdamW state or apply weight decay
+        # bookkeeping for parameters that never get a gradient
+        parameters = [p for p in self.parameters() if p.requires_grad]
+        optimizer = self.hp.optimizer(
+            parameters, lr=self.hp.lr,
+            weight_decay=self.hp.weight_decay)
+        if not self.hp.lr_scheduler:
             return optimizer
         lr_scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(
             optimizer,
-            factor=self.factor,
-            patience=self.patience,
+            factor=self.hp.factor,
+            patience=self.hp.patience,
         )
         return {
             "optimizer": optimizer,
@@ -127,8 +177,18 @@ class MultiModalLitModel(pl.LightningModule):
             }
         }
 
+    def autocast(self):
+        """Autocast context for the compute-bound encoder forwards (a no-op
+        unless running with --precision bf16 on CUDA); losses are accumulated
+        outside of it, in FP32.
+        """
+        return torch.autocast(
+            device_type="cuda", dtype=torch.bfloat16,
+            enabled=self.autocast_bf16 and torch.cuda.is_available())
+
     def forward(self, x, y, y_len):
-        return self.model(x, y, y_len)
+        with self.autocast():
+            return self.model(x, y, y_len)
 
     @staticmethod
     def load_model(model_name="cvcl"):
@@ -189,14 +249,17 @@ class MultiModalLitModel(pl.LightningModule):
         """
         if self.language_model.text_encoder.captioning or \
             self.language_model.text_encoder.has_attention:
-            # get image_features and image_feature_map if needed
+            # get image_features and image_feature_map if needed; features
+            # cached by the contrastive branch are already normalized (when
+            # configured) and are reused as-is, so the vision encoder runs at
+            # most once per step
             if image_features is None:
-                image_features, image_feature_map = self.model.encode_image(x)
+                with self.autocast():
+                    image_features, image_feature_map = \
+                        self.model.encode_image(x)
             # text_outputs is not reusable since it's not obtained from
             # captioning in the contrastive module
             outputs = None
-        else:
-            image_features, image_feature_map = None, None
 
         # calculate language model ce loss
         ret = self.language_model.calculate_ce_loss(
@@ -212,6 +275,36 @@ class MultiModalLitModel(pl.LightningModule):
             ret = ret + (image_features, image_feature_map)
         return ret
 
+    @staticmethod
+    def _tokenwise_ce_sums(ce_loss, labels, pad_id, sos_id, eos_id):
+        """Accumulates the masked ce-loss sums and token counts for all
+        non-pad tokens, excluding sos, and further excluding eos, in a
+        single pass over the tokenwise ce_loss.
+
+        Buckets each token into a category (0: pad, 1: sos, 2: eos,
+        3: regular) built from the cumulative masks, then recovers the
+        three nested sums as suffix sums over the categories.
+
+        Returns: Tuple of
+            ce_loss_sums: Tensor of shape [3]
+            n_tokens: Tensor of shape [3]
+        """
+        mask = labels.ne(pad_id)
+        mask_wo_sos = mask & labels.ne(sos_id)
+        mask_wo_sos_eos = mask_wo_sos & labels.ne(eos_id)
+        token_cat = mask.long() + mask_wo_sos.long() + mask_wo_sos_eos.long()
+        loss_sums = torch.zeros(
+            4, dtype=ce_loss.dtype, device=ce_loss.device).scatter_add_(
+                0, token_cat.reshape(-1), ce_loss.reshape(-1))
+        token_counts = torch.bincount(token_cat.reshape(-1), minlength=4)
+
+        ce_loss_sums = torch.stack(
+            [loss_sums[1:].sum(), loss_sums[2:].sum(), loss_sums[3]])
+        n_tokens = torch.stack(
+            [token_counts[1:].sum(), token_counts[2:].sum(),
+             token_counts[3]])
+        return ce_loss_sums, n_tokens
+
     def calculate_joint_loss(self, batch, stage, log, eval_textgen=False,
                              ce_weight=None):
         # batch of image-text pairs
@@ -225,11 +318,20 @@ class MultiModalLitModel(pl.LightningModule):
         # reuse image_features, image_feature_map and text_outputs if possible
         image_features, image_feature_map, text_outputs = None, None, None
 
-        if self.lambda_mm or not self.optimize_unused:
+        if self.hp.lambda_mm or not self.hp.optimize_unused:
+            # gather features across DDP ranks to enlarge the pool of
+            # contrastive negatives
+            all_gather = None
+            if self.trainer is not None and self.trainer.world_size > 1:
+                all_gather = functools.partial(
+                    self.all_gather, sync_grads=True)
+
             infonce_loss, image_accuracy, text_accuracy, \
                 image_entropy, text_entropy, logits_per_image, logits_per_text, \
                 image_features, image_feature_map, text_outputs = \
-                self.model.calculate_contrastive_loss(x, y, y_len)
+                self.model.calculate_contrastive_loss(
+                    x, y, y_len,
+                    all_gather=all_gather, rank=self.global_rank)
 
             # log
             log(f"{stage}_infonce_loss", infonce_loss)
@@ -237,21 +339,22 @@ class MultiModalLitModel(pl.LightningModule):
             log(f"{stage}_text_accuracy", text_accuracy)
             log(f"{stage}_image_entropy", image_entropy)
             log(f"{stage}_text_entropy", text_entropy)
+            # log the tensor directly; calling .item() here would force a
+            # device sync on every step. The value is identical on all ranks
+            # (it's a parameter), so don't pay an all-reduce for it
             log("temperature",
-                (-self.model.logit_neg_log_temperature).exp().item())
-
-            ret.update({
-                'infonce_loss': infonce_loss.detach(),
-                'image_accuracy': image_accuracy,
-                'text_accuracy': text_accuracy,
-                'image_entropy': image_entropy.detach(),
-                'text_entropy': text_entropy.detach(),
-            })
+                (-self.model.logit_neg_log_temperature).exp(),
+                sync_dist=False, rank_zero_only=True)
 
         else:
             infonce_loss = 0.
 
-        if self.lambda_lm or not self.optimize_unused:
+        if self.hp.lambda_lm or not self.hp.optimize_unused:
+            # the wo_sos/wo_sos_eos metrics need tokenwise losses; plain
+            # training can instead fuse the reduction into the ce kernel
+            # itself and never materialize the [B, T] loss tensor
+            detailed = self.hp.log_detailed_lm or stage != 'train'
+
             # calculate language model ce loss
             ce_loss, _, _, attns, labels, image_features, image_feature_map = \
             self.calculate_ce_loss(
@@ -260,7 +363,8 @@ class MultiModalLitModel(pl.LightningModule):
                 image_features=image_features,
                 image_feature_map=image_feature_map,
                 return_image_features=True,
-                tokenwise=True,
+                tokenwise=detailed,
+                reduction="sum",
                 weight=ce_weight,
             )
 
@@ -269,31 +373,35 @@ class MultiModalLitModel(pl.LightningModule):
             # divided by the sum of mask weighted by the weight. Here I ignored
             # the weight for simplicity, since it is not used in the main code.
 
-            # standard loss including all special tokens
-            mask = (labels != PAD_TOKEN_ID)
-            n_tokens = mask.sum()
-            lm_ce_loss = ce_loss.sum() / n_tokens
-            # excluding SOS_TOKEN
-            mask = mask & (labels != SOS_TOKEN_ID)
-            n_tokens_wo_sos = mask.sum()
-            lm_ce_loss_wo_sos = (ce_loss * mask).sum() / n_tokens_wo_sos
-            # further excluding EOS_TOKEN
-            mask = mask & (labels != EOS_TOKEN_ID)
-            n_tokens_wo_sos_eos = mask.sum()
-            lm_ce_loss_wo_sos_eos = (ce_loss * mask).sum() / n_tokens_wo_sos_eos
+            if detailed:
+                ce_loss_sums, n_tokens_vec = self._tokenwise_ce_sums(
+                    ce_loss, labels,
+                    self._pad_id, self._sos_id, self._eos_id)
+                lm_ce_loss, lm_ce_loss_wo_sos, lm_ce_loss_wo_sos_eos = \
+                    (ce_loss_sums / n_tokens_vec).unbind()
 
-            # log
-            log(f"{stage}_ce_loss", lm_ce_loss)
-            log(f"{stage}_ce_loss_wo_sos", lm_ce_loss_wo_sos)
-            log(f"{stage}_ce_loss_wo_sos_eos", lm_ce_loss_wo_sos_eos)
+                # log
+                log(f"{stage}_ce_loss", lm_ce_loss)
+                log(f"{stage}_ce_loss_wo_sos", lm_ce_loss_wo_sos)
+                log(f"{stage}_ce_loss_wo_sos_eos", lm_ce_loss_wo_sos_eos)
 
+            else:
+                # ce_loss is already the sum over non-pad tokens
+                n_tokens = labels.ne(self._pad_id).sum()
+                lm_ce_loss = ce_loss / n_tokens
+
+                # log
+                log(f"{stage}_ce_loss", lm_ce_loss)
+
+                ce_loss_sums = ce_loss.reshape(1)
+                n_tokens_vec = n_tokens.reshape(1)
+
+            # kept for the epoch-end perplexity, which needs token-weighted
+            # aggregation rather than Lightning's per-step mean; the epoch
+            # end derives the metric suffixes from the vector length
             ret.update({
-                'ce_loss': lm_ce_loss.detach(),
-                'ce_loss_wo_sos': lm_ce_loss_wo_sos.detach(),
-                'ce_loss_wo_sos_eos': lm_ce_loss_wo_sos_eos.detach(),
-                'n_tokens': n_tokens,
-                'n_tokens_wo_sos': n_tokens_wo_sos,
-                'n_tokens_wo_sos_eos': n_tokens_wo_sos_eos,
+                'ce_loss_sums': ce_loss_sums.detach(),
+                'n_tokens': n_tokens_vec,
             })
 
             # attention regularization loss
@@ -303,19 +411,15 @@ class MultiModalLitModel(pl.LightningModule):
                 # log
                 log(f"{stage}_attn_reg_loss", attn_reg_loss)
 
-                ret.update({
-                    'attn_reg_loss': attn_reg_loss.detach(),
-                })
-
             else:
                 attn_reg_loss = 0.
 
             if eval_textgen:
                 beam_seq, log_prob = self.language_model.beam_search_decode(
                     batch_size=ret['batch_size'],
-                    beam_width=self.beam_width,
-                    decode_length=self.decode_length,
-                    length_penalty_alpha=self.length_penalty_alpha,
+                    beam_width=self.hp.beam_width,
+                    decode_length=self.hp.decode_length,
+                    length_penalty_alpha=self.hp.length_penalty_alpha,
                     image_features=image_features
                         if self.language_model.text_encoder.captioning else
                         None,
@@ -350,8 +454,8 @@ class MultiModalLitModel(pl.LightningModule):
             attn_reg_loss = 0.
 
         # calculate joint loss
-        loss = self.lambda_mm * infonce_loss + self.lambda_lm * lm_ce_loss \
-            + self.lambda_ar * attn_reg_loss
+        loss = self.hp.lambda_mm * infonce_loss + self.hp.lambda_lm * lm_ce_loss \
+            + self.hp.lambda_ar * attn_reg_loss
 
         # log
         log(f"{stage}_loss", loss)
@@ -363,49 +467,23 @@ class MultiModalLitModel(pl.LightningModule):
         return ret
 
     def joint_loss_epoch_end(self, outputs, stage, log, eval_textgen=False):
-        def mean_over_examples(name):
-            # mean over examples
-            n_examples = 0
-            value_sum = 0.
-            for output in outputs:
-                batch_size = output['batch_size']
-                value = output[name].item()
-                n_examples += batch_size
-                value_sum += value * batch_size
-            value_mean = value_sum / n_examples
-            return value_mean
-
-        def mean_over_tokens(name, n_tokens_name):
-            # mean over tokens
-            n_tokens_sum = 0
-            value_sum = 0.
-            for output in outputs:
-                n_tokens = output[n_tokens_name].item()
-                value = output[name].item()
-                n_tokens_sum += n_tokens
-                value_sum += value * n_tokens
-            value_mean = value_sum / n_tokens_sum
-            return value_mean
-
-        if self.lambda_mm or not self.optimize_unused:
-            for name in (
-                'infonce_loss', 'image_accuracy', 'text_accuracy',
-                'image_entropy', 'text_entropy',):
-                log(f"{stage}_{name}", mean_over_examples(name))
-
-        if self.lambda_lm or not self.optimize_unused:
-            for suffix in ('', '_wo_sos', '_wo_sos_eos'):
-                value_mean = mean_over_tokens(
-                    f'ce_loss{suffix}', f'n_tokens{suffix}')
-                log(f"{stage}_ce_loss{suffix}", value_mean)
-
-                # perplexity
-                perplexity = np.exp(value_mean)
-                log(f"{stage}_perplexity{suffix}", perplexity)
-
-            if self.language_model.text_encoder.has_attention:
-                for name in ('attn_reg_loss',):
-                    log(f"{stage}_{name}", mean_over_examples(name))
+        # step-level metrics are aggregated by Lightning itself
+        # (on_epoch=True in the step log calls); only metrics that cannot be
+        # recovered from per-step means are derived here
+        if self.hp.lambda_lm or not self.hp.optimize_unused:
+            # perplexity is the exp of the token-weighted mean ce, which is
+            # not a mean of per-batch values; sum the packed per-batch
+            # sum/count vectors on device in one stacked reduction
+            ce_loss_sums = torch.stack(
+                [output['ce_loss_sums'] for output in outputs]).sum(0)
+            n_tokens = torch.stack(
+                [output['n_tokens'] for output in outputs])\
+                .to(ce_loss_sums).sum(0)
+            value_means = ce_loss_sums / n_tokens
+
+            suffixes = ('', '_wo_sos', '_wo_sos_eos')[:value_means.numel()]
+            for suffix, value_mean in zip(suffixes, value_means.unbind()):
+                log(f"{stage}_perplexity{suffix}", torch.exp(value_mean))
 
             if eval_textgen:
                 list_of_references, hypotheses = [], []
@@ -427,19 +505,13 @@ class MultiModalLitModel(pl.LightningModule):
                 for metric, score in score_dict.items():
                     log(f"{stage}_{metric}", score)
 
-        for name in ('loss',):
-            log(f"{stage}_{name}", mean_over_examples(name))
-
     def training_step(self, batch, batch_idx):
+        # let Lightning aggregate the epoch means from the step values
+        log = functools.partial(
+            self.log, on_step=True, on_epoch=True,
+            batch_size=batch[0].size(0))
         return self.calculate_joint_loss(
-            batch, 'train', self.log, eval_textgen=False)
-
-    def training_epoch_end(self, outputs):
-        log = lambda name, value, *args, **kwargs: self.log(
-            f'{name}_epoch', value, on_step=False, on_epoch=True,
-            *args, **kwargs)
-        return self.joint_loss_epoch_end(
-            outputs, 'train', log, eval_textgen=False)
+            batch, 'train', log, eval_textgen=False)
 
     def validation_test_step(self, stage, batch, batch_idx, dataloader_idx=0):
         log = functools.partial(self.log, on_step=False, on_epoch=True)
@@ -447,56 +519,79 @@ class MultiModalLitModel(pl.LightningModule):
         ret = {}
 
         if dataloader_idx == 0:
-            empty_log = lambda *args, **kwargs: None
+            # add_dataloader_idx=False keeps the metric names free of the
+            # /dataloader_idx_0 suffix Lightning appends with multiple val
+            # dataloaders, so the val_loss monitored by ModelCheckpoint and
+            # ReduceLROnPlateau resolves (names are unique across the two
+            # dataloaders anyway)
+            joint_loss_log = functools.partial(
+                log, sync_dist=True, batch_size=batch[0].size(0),
+                add_dataloader_idx=False)
             ret.update(self.calculate_joint_loss(
-                batch, stage, empty_log, eval_textgen=self.eval_textgen))
+                batch, stage, joint_loss_log,
+                eval_textgen=self.hp.eval_textgen))
 
         elif dataloader_idx == 1:
-            # batch of evaluation trials (only one trial at a time)
-            x, y, y_len, raw_y = batch
-
-            # resize x so images from the same trial are in the batch dim
-            # [B, N, C, H, W] -> [B*N, C, H, W]  (with B = 1)
-            x = x.view(-1, *x.shape[-3:])
-
-            if self.lambda_mm:
-                logits_per_image, logits_per_text = self.model(x, y, y_len)
-                logits = logits_per_text[0]  # get logits per trial
-
-            elif self.lambda_lm and (
-                    self.language_model.text_encoder.captioning or
-                    self.language_model.text_encoder.has_attention) \
-                    and y[0, 0].item() == SOS_TOKEN_ID:
-                # tile y to match the batch size
-                y = y.expand(x.size(0), -1)
-                y_len = y_len.expand(x.size(0))
-
-                # calculate language model ce loss
-                ce_loss, _, _, _, labels = self.calculate_ce_loss(
-                    y, y_len, x=x, tokenwise=True)
-
-                # use - ce_loss on the word as logits
-                logits = - ce_loss[:, 0]
-
-            else:
-                logits = None
-
-            if logits is not None:
-                # calculate accuracy
-                pred = torch.argmax(logits).item()
-                label = 0  # correct answer is always the first item
-                accuracy = int(pred == label)
-                entropy = get_entropy(logits)
-
-                # log evaluation accuracy and entropy
-                log(f"{stage}_accuracy", accuracy)
-                log(f"{stage}_entropy", entropy)
-
-                # log category-level evaluation accuracies as a separate metric
-                category_label = raw_y[0][0]
-                log(f"{stage}_accuracy_{category_label}", accuracy)
-
-                ret.update({'accuracy': accuracy})
+            # batch of evaluation trials; no grads are ever needed here, and
+            # inference_mode additionally skips the autograd bookkeeping that
+            # Lightning's no_grad still pays for
+            with torch.inference_mode():
+                x, y, y_len, raw_y = batch
+                n_trials, n_imgs = x.size(0), x.size(1)
+
+                # resize x so images from all trials are in the batch dim
+                # [B, N, C, H, W] -> [B*N, C, H, W]
+                x = x.view(-1, *x.shape[-3:])
+
+                if self.hp.lambda_mm:
+                    logits_per_image, logits_per_text = self.model(
+                        x, y, y_len)
+                    # keep the logits of each trial over its own images
+                    # [B, B*N] -> [B, N]
+                    trial_idxs = torch.arange(
+                        n_trials, device=logits_per_text.device)
+                    logits = logits_per_text.view(
+                        n_trials, n_trials, n_imgs)[trial_idxs, trial_idxs]
+
+                elif self.hp.lambda_lm and (
+                        self.language_model.text_encoder.captioning or
+                        self.language_model.text_encoder.has_attention) \
+                        and y[0, 0].item() == SOS_TOKEN_ID:
+                    # tile y so each trial's label matches its own images
+                    y = y.repeat_interleave(n_imgs, dim=0)
+                    y_len = y_len.repeat_interleave(n_imgs, dim=0)
+
+                    # calculate language model ce loss
+                    ce_loss, _, _, _, labels = self.calculate_ce_loss(
+                        y, y_len, x=x, tokenwise=True)
+
+                    # use - ce_loss on the word as logits
+                    logits = - ce_loss[:, 0].view(n_trials, n_imgs)
+
+                else:
+                    logits = None
+
+                if logits is not None:
+                    # calculate accuracy on device, with a single batched
+                    # argmax; the correct answer is always the first item
+                    preds = torch.argmax(logits, dim=-1)
+                    accuracies = (preds == 0).float()
+                    entropies = get_entropy(logits, dim=-1)
+
+                    # log evaluation accuracy and entropy
+                    log(f"{stage}_accuracy", accuracies.mean(),
+                        batch_size=n_trials)
+                    log(f"{stage}_entropy", entropies.mean(),
+                        batch_size=n_trials)
+
+                    # log category-level evaluation accuracies as a separate
+                    # metric
+                    for trial_idx, trial_raw_y in enumerate(raw_y):
+                        category_label = trial_raw_y[0]
+                        log(f"{stage}_accuracy_{category_label}",
+                            accuracies[trial_idx])
+
+                    ret.update({'accuracy': accuracies})
 
         return ret
 
@@ -504,7 +599,7 @@ class MultiModalLitModel(pl.LightningModule):
         # only deal with outputs of the first dataset
         log = functools.partial(self.log, on_step=False, on_epoch=True)
         return self.joint_loss_epoch_end(
-            outputs[0], stage, log, eval_textgen=self.eval_textgen)
+            outputs[0], stage, log, eval_textgen=self.hp.eval_textgen)
 
     def validation_step(self, batch, batch_idx, dataloader_idx=0):
         if dataloader_idx < N_VAL_DATALOADERS_PER_SPLIT:  # as normal
@@ -1,5 +1,7 @@
 from PIL import ImageFilter
+import functools
 import os
+import re
 import sys
 import random
 import numpy as np
@@ -7,19 +9,20 @@ import torch
 import torch.nn.functional as F
 from huggingface_hub import hf_hub_download
 
+@functools.lru_cache(maxsize=None)
+def _msplit_pattern(delimiters):
+    return re.compile("|".join(map(re.escape, delimiters)))
+
+
 def msplit(string, delimiters):
     """Split with multiple delimiters."""
-    delimiters = tuple(delimiters)
-    stack = [string, ]
+    # a single pass with a compiled (and cached) regex instead of
+    # re-splitting the growing list of substrings per delimiter
+    return _msplit_pattern(tuple(delimiters)).split(string)
 
-    for delimiter in delimiters:
-        for i, substring in enumerate(stack):
-            substack = substring.split(delimiter)
-            stack.pop(i)
-            for j, _substring in enumerate(substack):
-                stack.insert(i + j, _substring)
 
-    return stack
+# single-digit tens of seconds -> seconds (see convert_timestamps_to_seconds)
+_TENS_OF_SECONDS = {'1': '10', '2': '20', '3': '30', '4': '40', '5': '50'}
 
 
 def convert_timestamps_to_seconds(timestamps):
@@ -42,16 +45,7 @@ def convert_timestamps_to_seconds(timestamps):
                 else:
                     # sometimes only the tens of seconds are reported as single digits
                     # this converts these values to seconds
-                    if splits[1] == '1':
-                        splits[1] = '10'
-                    elif splits[1] == '2':
-                        splits[1] = '20'
-                    elif splits[1] == '3':
-                        splits[1] = '30'
-                    elif splits[1] == '4':
-                        splits[1] = '40'
-                    elif splits[1] == '5':
-                        splits[1] = '50'
+                    splits[1] = _TENS_OF_SECONDS.get(splits[1], splits[1])
 
                 # trim whitespace
                 splits[0] = splits[0].strip()
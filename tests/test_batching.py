@@ -106,6 +106,95 @@ def test_flat_embedding():
         assert torch.allclose(y_batched, y_unbatched, atol=1e-5)
         
         
+def test_fused_ce_reduction():
+    # the fused scatter-add/bincount reduction must reproduce the three
+    # masked sums and token counts it replaced in calculate_joint_loss
+    pad_id = multimodal_data_module.PAD_TOKEN_ID
+    sos_id = multimodal_data_module.SOS_TOKEN_ID
+    eos_id = multimodal_data_module.EOS_TOKEN_ID
+
+    batch_size = 8
+    max_seq_len = 16
+
+    # random padded batch with sos/eos planted like real utterances
+    labels = torch.full((batch_size, max_seq_len), pad_id, dtype=torch.long)
+    seq_lens = torch.randint(low=3, high=max_seq_len, size=(batch_size,))
+    for i in range(batch_size):
+        labels[i, 0] = sos_id
+        labels[i, 1:seq_lens[i] - 1] = torch.randint(
+            low=4, high=100, size=(seq_lens[i] - 2,))
+        labels[i, seq_lens[i] - 1] = eos_id
+    ce_loss = torch.rand(batch_size, max_seq_len)
+
+    # compute fused and reference reductions
+    ce_loss_sums, n_tokens = \
+        multimodal_lit.MultiModalLitModel._tokenwise_ce_sums(
+            ce_loss, labels, pad_id, sos_id, eos_id)
+
+    mask = labels != pad_id
+    mask_wo_sos = mask & (labels != sos_id)
+    mask_wo_sos_eos = mask_wo_sos & (labels != eos_id)
+    masks = (mask, mask_wo_sos, mask_wo_sos_eos)
+    expected_sums = torch.stack([ce_loss[m].sum() for m in masks])
+    expected_counts = torch.stack([m.sum() for m in masks])
+
+    # compare
+    assert torch.allclose(ce_loss_sums, expected_sums, atol=1e-5)
+    assert (n_tokens == expected_counts).all()
+
+
+def test_eval_trial_batching():
+    # scoring all evaluation trials in one batch (as validation_test_step
+    # does) must produce the same per-trial logits and accuracies as
+    # scoring one trial at a time
+    args = argparse.Namespace(
+        embedding_type="flat",
+        embedding_dim=128,
+        pretrained_cnn=False,
+        finetune_cnn=False,
+        text_encoder="embedding",
+    )
+
+    # small vocab with the special tokens at their usual ids
+    vocab = {multimodal_data_module.PAD_TOKEN: 0,
+             multimodal_data_module.UNK_TOKEN: 1,
+             multimodal_data_module.SOS_TOKEN: 2,
+             multimodal_data_module.EOS_TOKEN: 3}
+    vocab.update({f"word{i}": i for i in range(4, 100)})
+
+    # initialize multimodal model
+    vision_encoder = multimodal.VisionEncoder(args)
+    text_encoder = multimodal.TextEncoder(
+        vocab, image_feature_map_dim=vision_encoder.last_cnn_out_dim,
+        args=args)
+    model = multimodal.MultiModalModel(vision_encoder, text_encoder, args)
+    model.eval()
+
+    # random batch of evaluation trials
+    n_trials, n_imgs, max_seq_len = 3, 2, 4
+    x = torch.rand([n_trials, n_imgs, 3, 224, 224])
+    y = torch.randint(low=4, high=100, size=(n_trials, max_seq_len))
+    y_len = torch.full((n_trials,), max_seq_len, dtype=torch.long)
+
+    with torch.no_grad():
+        # batched: images from all trials in the batch dim, then keep the
+        # logits of each trial over its own images
+        _, logits_per_text = model(x.view(-1, *x.shape[-3:]), y, y_len)
+        trial_idxs = torch.arange(n_trials)
+        logits_batched = logits_per_text.view(
+            n_trials, n_trials, n_imgs)[trial_idxs, trial_idxs]
+
+        # unbatched: one trial at a time
+        logits_unbatched = torch.cat([
+            model(x[i], y[i:i + 1], y_len[i:i + 1])[1]
+            for i in range(n_trials)])
+
+        # compare
+        assert torch.allclose(logits_batched, logits_unbatched, atol=1e-5)
+        assert (logits_batched.argmax(dim=-1)
+                == logits_unbatched.argmax(dim=-1)).all()
+
+
 def test_lstm():
     # create cartesian product of lstm configs
     embedding_types = ["flat", "spatial"]
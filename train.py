@@ -60,6 +60,11 @@ def main():
     parser = _setup_parser()
     args = parser.parse_args()
 
+    # allow TF32 matmuls on Ampere+ GPUs for training; kept out of the
+    # multimodal modules so eval scripts keep full fp32 matmuls
+    if hasattr(torch, "set_float32_matmul_precision"):
+        torch.set_float32_matmul_precision("high")
+
     # checkpoint paths
     ckpt_dir = Path('checkpoints') / args.exp_name
     if str(args.resume_ckpt) == "last":